@@ -49,7 +49,7 @@ __credits__  = "SLAC"
 #
 #  For the detailed API see the documentation for class PNetlogger.
 
-import datetime, getpass, md5, os, random, re, socket, sys, time, urlparse
+import datetime, getpass, hashlib, os, random, re, socket, sys, time
 
 import PipelineNetloggerConfig as Config
 
@@ -81,17 +81,17 @@ def _metalog(level):
     def log(self, evnt, msg, tgt="", timestamp=None, scid=-1, link="", **kwargs):
         # Start the dictionary of log message items with all the "tag_"
         # keyword items.
-        items = dict((k, v) for k, v in kwargs.iteritems() if k.startswith("tag_"))
+        items = dict((k, v) for k, v in kwargs.items() if k.startswith("tag_"))
         # Were there any non-standard keyword args not starting with "tag_"?
         if len(items) != len(kwargs):
             raise TypeError("Invalid keyword arguments for logging: %s" %
                            ", ".join(set(kwargs) - set(items)))
         # Do all tags have integer values?
-        bad = set(k for k, v in items.iteritems() if type(v) not in (int, long))
+        bad = set(k for k, v in items.items() if not isinstance(v, int))
         if bad:
             raise ValueError("Tags don't have integer values: %s" % ", ".join(bad))
         # By convention Netlogger field names are upper case.
-        items = dict((k.upper(), v) for k, v in items.iteritems())
+        items = dict((k.upper(), v) for k, v in items.items())
         # Add the standard args to the items dict and call the formatting method.
         items.update(dict(EVENT=evnt,
                           MSG=msg,
@@ -212,7 +212,7 @@ class PNetlogger(object):
         logged. One of 'DEBUG', 'INFO', 'WARN', 'ERROR', or 'FATAL'.
         """
         try:
-            self._loglevel = self._levelNames.index(netlogLevel.upper())
+            self._logLevel = self._levelNames.index(netlogLevel.upper())
         except ValueError:
             raise ValueError("'%s' is not a valid level name." % netlogLevel)
 
@@ -258,7 +258,7 @@ class _NetlogdAppender(object):
             try:
                 sock.connect(dest)
                 # Send the message, close the socket
-                sock.sendall(msg)
+                sock.sendall(msg.encode())
                 sock.close()
                 # Exit the loop over destinations.
                 sent = True
@@ -267,8 +267,8 @@ class _NetlogdAppender(object):
 
         # If no connection was made dump the message to stderr.
         if not sent:
-            print >>sys.stderr, "Couldn't send this ISOC log message to any server:"
-            print msg
+            sys.stderr.write("Couldn't send this ISOC log message to any server:\n")
+            sys.stderr.write(str(msg) + "\n")
 
 
 
@@ -300,7 +300,7 @@ def _parseNetlogDest(netlogDest):
 def _dictToText(d):
     # A generator that yields text lines (with newlines)
     # given a message a dictionary form.
-    for k, v in d.iteritems():
+    for k, v in d.items():
         k = _filterKey(k)
         t, v = _filterValue(v)
         yield "%s %s: %s\n" % (t, k, v)
@@ -334,7 +334,6 @@ class _dt(datetime.datetime):
 
 # Associate data types with type letters.
 _TYPE_LETTER = {int:   "i",
-               long:  "i",
                str:   "s",
                float: "f",
                _dt: "t"
@@ -398,10 +397,10 @@ class _IsocTransmogrifier(_Transmogrifier):
 
     def __init__(self):
         # Replace by a null string each eight-bit character.
-        repdict = dict(  (chr(x), "") for x in xrange(128, 256))
+        repdict = dict(  (chr(x), "") for x in range(128, 256))
         # Replace by null strings all control characters except space, tab, and newline.
         repdict.update( dict((chr(x), "")
-                             for x in xrange(0, 26)
+                             for x in range(0, 26)
                              if x not in (ord(" "), ord("\t"), ord("\n"))) )
         # Change newline to " -NL- ".
         repdict["\n"] = " -NL- "
@@ -418,13 +417,13 @@ _cleanText = _IsocTransmogrifier()
 def _uuid( *args ):
   # Generates a universally unique ID.
   # Any arguments only create more randomness.
-  t = long( time.time() * 1000 )
-  r = long( random.random()*100000000000000000L )
+  t = int( time.time() * 1000 )
+  r = int( random.random()*100000000000000000 )
   try:
     a = socket.gethostbyname( socket.gethostname() )
   except:
     # if we can't get a network address, just imagine one
-    a = random.random()*100000000000000000L
+    a = random.random()*100000000000000000
   data = str(t)+' '+str(r)+' '+str(a)+' '+str(args)
-  data = md5.md5(data).hexdigest()
+  data = hashlib.md5(data.encode()).hexdigest()
   return data
@@ -3,6 +3,8 @@
 ## Preliminaries
 ##
 
+from __future__ import print_function
+
 from GPL import *
 
 class PipelineSummary():
@@ -64,17 +66,17 @@ Pipeline.TimeInSAA: 89334
     
 ## Debugging dump of internal list of summary data
     def dump(self):
-        print 'Dump of current user summary data:'
-        print "Summary filename = ",self.filename
-        print "Summary item prefix = ",self.prefix
-        print "There are ",self.numItems," items in the Summary list."
-##        print self.itemList
-        print "\n----------begin summary----------------------------------"
+        print('Dump of current user summary data:')
+        print("Summary filename = ", self.filename)
+        print("Summary item prefix = ", self.prefix)
+        print("There are ", self.numItems, " items in the Summary list.")
+##        print(self.itemList)
+        print("\n----------begin summary----------------------------------")
         for x in self.itemList:
             x = x.strip()
-            print x
+            print(x)
             pass
-        print "----------end summary----------------------------------\n"
+        print("----------end summary----------------------------------\n")
         sys.stdout.flush()
         return
     
@@ -1,4 +1,4 @@
-#!/usr/bin/env python2.5
+#!/usr/bin/env python
 
 import hashlib
 import optparse
@@ -7,12 +7,17 @@ import os
 import sys
 import threading
 import time
-import Queue
+import zlib
+
+try:
+    import Queue
+except ImportError:
+    import queue as Queue
 
 
 defaultBlock = 2**20
 defaultPool = 2**25
-defaultDepth = defaultPool / defaultBlock
+defaultDepth = defaultPool // defaultBlock
 
 def timeCopy(fun, inFile, outFile):
     size = os.stat(inFile).st_size / 1e6
@@ -21,7 +26,7 @@ def timeCopy(fun, inFile, outFile):
     stop = time.time()
     delta = stop - start
     rate = size / delta
-    print fun, size, delta, rate, result
+    print(fun, size, delta, rate, result)
     return
 
 
@@ -79,19 +84,52 @@ def dumbSum(inFile, outFile):
     """Copy a file, performing an md5 checksum on the fly.
     The input file is read once, the output file not at all.
     Return value is a string containing the hex representation of the sum.
+
+    Blocks are defaultBlock (1 MiB) - big enough to keep syscall counts
+    low on NFS - and a single buffer is reused for the whole file via
+    readinto, so the loop allocates nothing per block.
     """
     summer = hashlib.md5()
-    reader = readIt(inFile)
     ofp = open(outFile, 'wb')
-    for block in reader:
-        summer.update(block)
-        ofp.write(block)
-        continue
+    ifp = open(inFile, 'rb')
+    readinto = getattr(ifp, 'readinto', None)
+    if readinto is not None:
+        buf = bytearray(defaultBlock)
+        view = memoryview(buf)
+        while True:
+            n = readinto(buf)
+            if not n: break
+            block = view[:n]
+            summer.update(block)
+            ofp.write(block)
+            continue
+        ifp.close()
+    else:
+        # Python 2 file objects have no readinto; allocate per block.
+        ifp.close()
+        for block in readIt(inFile):
+            summer.update(block)
+            ofp.write(block)
+            continue
+        pass
     ofp.close()
     digest = summer.hexdigest()
     return digest
 
 
+def crc32File(inFile):
+    """Compute the CRC-32 and size of a file in one buffered pass.
+    Return value is a (crc, size) tuple.
+    """
+    crc = 0
+    size = 0
+    for block in readIt(inFile):
+        crc = zlib.crc32(block, crc)
+        size += len(block)
+        continue
+    return crc & 0xffffffff, size
+
+
 def osCopy(inFile, outFile):
     cmd = 'cp %s %s' % (inFile, outFile)
     os.system(cmd)
@@ -141,6 +179,8 @@ class readIt(object):
             raise StopIteration
         return block
 
+    __next__ = next           # Python 3 iterator protocol
+
     def __iter__(self):
         return self
 
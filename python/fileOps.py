@@ -2,6 +2,7 @@
 """
 
 
+import os
 import random
 import sys
 import time
@@ -14,7 +15,7 @@ import xrootdFileOps
 import logging
 log = logging.getLogger("gplLong")
 
-dirMode = 0755
+dirMode = 0o755
 
 maxtry = 5
 minWait = 5
@@ -22,28 +23,54 @@ maxWait = 10
 
 xrootStart = "root:"
 
+## Monotonic clock for rate timing where available (Python 2 lacks it)
+_timer = getattr(time, 'monotonic', time.time)
+
+
+maxBackoff = 60
+
 
 def waitABit(minDelay=None, maxDelay=None):
     if minDelay is None: minDelay = minWait
     if maxDelay is None: maxDelay = maxWait
     delay = random.randrange(minDelay, maxDelay+1)
-    log.info("Waiting %d seconds." % delay)
+    log.info("Waiting %d seconds.", delay)
     time.sleep(delay)
     return
 
 
+def backOff(attempt, maxDelay=None):
+    """@brief Sleep before retry number attempt (1-based).
+    Exponential growth (1, 2, 4, ... capped) with sub-second jitter, so
+    a momentary glitch retries quickly while persistent failures don't
+    hammer the filesystem.
+    """
+    if maxDelay is None: maxDelay = maxBackoff
+    delay = min(maxDelay, (1 << (attempt - 1)) + random.random())
+    log.info("Waiting %.1f seconds.", delay)
+    time.sleep(delay)
+    return
+
+
+## Map URL scheme to implementation module.  Plain paths (no "scheme:")
+## fall through to the filesystem implementation.  Adding support for a
+## new remote store is a one-line change here.
+_implForScheme = {
+    'root': xrootdFileOps,
+    }
+
+
 def whichImplementation(*fileNames):
-    anyXrootd = any(map(isOnXrootd, fileNames))
-    if anyXrootd:
-        impl = xrootdFileOps
-    else:
-        impl = fsFileOps
-        pass
-    return impl
+    for fileName in fileNames:
+        impl = _implForScheme.get(fileName.partition(':')[0])
+        if impl is not None:
+            return impl
+        continue
+    return fsFileOps
 
 
 def isOnXrootd(fileName):
-    return fileName.startswith(xrootStart)
+    return _implForScheme.get(fileName.partition(':')[0]) is xrootdFileOps
 
 
 def _makeWrapper(funcName):
@@ -76,31 +103,45 @@ def copy(fromFile, toFile, maxTry=None):
     rc = 0
 
     if toFile == fromFile:
-        log.info("Not copying %s to itself." % fromFile)
+        log.info("Not copying %s to itself.", fromFile)
         return rc
 
     impl = whichImplementation(fromFile, toFile)
 
+    # Idempotent reruns often ask to copy a file whose destination
+    # already holds the same bytes; opt in to skipping those with
+    # GPL_STAGE_SKIP_IDENTICAL=1 (local files only).
+    if impl is fsFileOps and \
+           os.environ.get('GPL_STAGE_SKIP_IDENTICAL') == '1' and \
+           fsFileOps.identical(fromFile, toFile):
+        log.info("Destination %s already identical, not copying.", toFile)
+        return rc
+
     tn = tempName(toFile)
 
-    log.info("Copying %s to %s " % (fromFile, tn))
+    log.info("Copying %s to %s ", fromFile, tn)
+
+    # Only time the transfer and report rates when somebody will see
+    # the result; the arithmetic and formatting are wasted otherwise.
+    wantRate = log.isEnabledFor(logging.INFO)
+    deltaT = None
 
     # To allow for possible filesystem failures (e.g. delay to
     # automount), several attempts are made to copy the input file to
     # local scratch space.  If that fails, then staging is effectively
     # disabled for that file.
     for mytry in range(maxTry):
-        if mytry: waitABit()
+        if mytry: backOff(mytry)
         rc = 0
-        start = time.time()
+        if wantRate: start = _timer()
 
-        log.info('Starting try %d.' % mytry)
+        log.info('Starting try %d.', mytry)
 
         try:
             # Verify source file is accessible and get its size
             fromSize = getSize(fromFile)
             if fromSize is None:
-                log.error('%s does not exist!' % fromFile)
+                log.error('%s does not exist!', fromFile)
                 rc |= 1
                 continue
 
@@ -115,14 +156,14 @@ def copy(fromFile, toFile, maxTry=None):
             rc |= impl.copy(fromFile, tn)
         except EnvironmentError:
             rc |= 1
-            log.error("Error copying file to %s (try %d):" % (tn, mytry))
+            log.error("Error copying file to %s (try %d):", tn, mytry)
             traceback.print_exc()
             continue
 
         if rc: continue
-        
-        deltaT = time.time() - start
-        
+
+        if wantRate: deltaT = _timer() - start
+
         # Verify destination file has been copied
         try:
             toSize = getSize(tn)
@@ -130,7 +171,7 @@ def copy(fromFile, toFile, maxTry=None):
             toSize = None
             pass
         if toSize is None:
-            log.error('%s does not exist!' % tn)
+            log.error('%s does not exist!', tn)
             rc = 1
             continue
 
@@ -143,37 +184,40 @@ def copy(fromFile, toFile, maxTry=None):
 
         rc |= unTemp(toFile)
         
-        log.debug('Try %d rc: %d' % (mytry,rc))
+        log.debug('Try %d rc: %d', mytry, rc)
         if not rc: break
         continue
 
     if rc:
-        log.info('Failed after %d tries' % (mytry+1))
+        log.info('Failed after %d tries', mytry+1)
         return 1
     
-    log.info('Succeeded after %d tries' % (mytry+1))
-
-    if deltaT:
-        rate = '%g' % (float(toSize) / deltaT)
-    else:
-        rate = 'many'
+    if wantRate:
+        log.info('Succeeded after %d tries', mytry+1)
+        if deltaT:
+            rate = '%g' % (float(toSize) / deltaT)
+        else:
+            rate = 'many'
+            pass
+        log.info('Transferred %g bytes in %g seconds, avg. rate = %s B/s' %
+                 (toSize, deltaT, rate))
         pass
-    log.info('Transferred %g bytes in %g seconds, avg. rate = %s B/s' %
-             (toSize, deltaT, rate))
 
     return rc
 
 
 def exists(fileName):
-    log.info("Verifying existence of " + fileName)
+    log.info("Verifying existence of %s", fileName)
     impl = whichImplementation(fileName)
     rc = impl.exists(fileName)
-    if not rc: log.error("Could not access requested file: " + fileName)
+    if not rc: log.error("Could not access requested file: %s", fileName)
     return rc
 
 
 getSize = _makeWrapper('getSize')
 
+getSum = _makeWrapper('getSum')
+
 
 def makedirs(name, mode=None):
     if mode is None: mode = dirMode
@@ -3,6 +3,8 @@
 """@brief Interface to pipeline functions.
 """
 
+from __future__ import print_function
+
 import os
 import sys
 
@@ -13,7 +15,8 @@ def setVariable(varName, value):
     # use bash function
     value = str(value)
     if len(value) > maxVarLength:
-        print >> sys.stderr, 'Variable is probably too long to work correctly (max %s).' % maxVarLength
+        print('Variable is probably too long to work correctly (max %s).'
+              % maxVarLength, file=sys.stderr)
         pass
     cmd = "pipelineSet %s '%s'" % (varName, value)
     status = runner.run(cmd)
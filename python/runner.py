@@ -3,33 +3,66 @@
 @author W. Focke <focke@slac.stanford.edu>
 """
 
-import os
+from __future__ import print_function
+
+import subprocess
 import sys
 import time
 
-def run(cmd):
+## time.clock was removed in Python 3.8; process_time is its replacement.
+_cpuTimer = getattr(time, 'process_time', None) or time.clock
+
+## Python 2's subprocess has no timeout support; there we just run
+## without one (the placeholder exception is never raised).
+_haveTimeout = hasattr(subprocess, 'TimeoutExpired')
+if _haveTimeout:
+    _TimeoutExpired = subprocess.TimeoutExpired
+else:
+    class _TimeoutExpired(Exception):
+        pass
+
+## Exit code reported for a timed-out command (shell convention).
+timeoutStatus = 124
+
+def run(cmd, timeout=None):
     """@brief Run an external command (like os.system(), plus some logging).
-    @param cmd The command to run.
+    @param cmd The command to run: either a shell command string, or an
+    argv list which is executed directly with no shell in between (no
+    extra fork, no quoting surprises).
+    @param [timeout] Seconds to wait before killing the command and
+    reporting failure (ignored on Python 2).
     """
-    print >> sys.stderr, '---------------- start commentary ----------------'
-    print >> sys.stderr, "About to run [%s] at %s" % (cmd, time.asctime())
-    print >> sys.stderr, '---------------- start log ----------------'
-    cstart = time.clock()
+    useShell = isinstance(cmd, str)
+    kwargs = {}
+    if timeout is not None and _haveTimeout:
+        kwargs['timeout'] = timeout
+    print('---------------- start commentary ----------------', file=sys.stderr)
+    print("About to run [%s] at %s" % (cmd, time.asctime()), file=sys.stderr)
+    print('---------------- start log ----------------', file=sys.stderr)
+    cstart = _cpuTimer()
     wstart = time.time()
-    status = os.system(cmd)
-    cstop = time.clock()
+    try:
+        status = subprocess.call(cmd, shell=useShell, **kwargs)
+    except _TimeoutExpired:
+        # subprocess.call has already killed the child
+        print("Timed out after %s seconds" % timeout, file=sys.stderr)
+        status = timeoutStatus
+    cstop = _cpuTimer()
     wstop = time.time()
-    print >> sys.stderr, '----------------  end log  ----------------'
-    print >> sys.stderr, "Ended at %s" % time.asctime()
-    print >> sys.stderr, "Raw status = %d" % status
-    cookedStatus = status >> 8
-    print >> sys.stderr, "Exit code = %d" % cookedStatus
-    signal = status & 127
-    if signal: print >> sys.stderr, "Signal = %d" % signal
-    coreDump = status & 128
-    if coreDump: print >> sys.stderr, "Core dumped."
-    print >> sys.stderr, 'CPU:  %f' % (cstop - cstart)
-    print >> sys.stderr, 'Wall: %f' % (wstop - wstart)
-    print >> sys.stderr, '----------------  end commentary  ----------------'
+    print('----------------  end log  ----------------', file=sys.stderr)
+    print("Ended at %s" % time.asctime(), file=sys.stderr)
+    print("Raw status = %d" % status, file=sys.stderr)
+    if status < 0:
+        cookedStatus = 0
+        signal = -status
+    else:
+        cookedStatus = status
+        signal = 0
+        pass
+    print("Exit code = %d" % cookedStatus, file=sys.stderr)
+    if signal: print("Signal = %d" % signal, file=sys.stderr)
+    print('CPU:  %f' % (cstop - cstart), file=sys.stderr)
+    print('Wall: %f' % (wstop - wstart), file=sys.stderr)
+    print('----------------  end commentary  ----------------', file=sys.stderr)
     returnStatus = cookedStatus | signal
     return returnStatus
@@ -8,14 +8,17 @@ refactored: T.Glanzman 2/22/2007
 
 ## Preliminaries
 import os
-import re
 import sys
-import shutil
 import time
 
 import fileOps
 import runner
 
+try:
+    from concurrent import futures
+except ImportError:     # Python 2: no executor, stage copies stay serial
+    futures = None
+
 ## Set up message logging
 import logging
 log = logging.getLogger("gplLong")
@@ -24,6 +27,194 @@ filterAfs = '^/afs/'
 filterAll = '.*'
 filterNone = None
 defaultStrictSetup = False
+defaultStageWorkers = 8
+
+## Finished stage directories are parked under <stageArea>/.pool and
+## handed to the next StageSet instead of being rmdir'd and re-made.
+poolDirName = '.pool'
+maxPoolSize = 32
+_poolSeq = 0
+
+
+def _logDirListing(dirPath, depth=1):
+    """@brief Log the entries of a directory with their sizes.
+    One in-process directory scan replaces the forked 'ls -laF'.
+    os.scandir hands back each entry's stat info from the directory
+    read itself, so no per-entry lstat syscalls; Python 2 falls back
+    to listdir+lstat.
+    """
+    scandir = getattr(os, 'scandir', None)
+    if scandir is None:
+        _logDirListingNoScandir(dirPath, depth)
+        return
+    try:
+        entries = sorted(scandir(dirPath), key=lambda e: e.name)
+    except OSError as e:
+        log.info('cannot list %s: %s', dirPath, e)
+        return
+    for entry in entries:
+        try:
+            size = entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+        log.info('%10d %s', size, entry.name)
+        if depth and entry.is_dir(follow_symlinks=False):
+            _logDirListing(entry.path, depth-1)
+            pass
+        continue
+    return
+
+
+def _logDirListingNoScandir(dirPath, depth):
+    """@brief listdir+lstat fallback for Python 2."""
+    try:
+        names = sorted(os.listdir(dirPath))
+    except OSError as e:
+        log.info('cannot list %s: %s', dirPath, e)
+        return
+    for name in names:
+        path = os.path.join(dirPath, name)
+        try:
+            size = os.lstat(path).st_size
+        except OSError:
+            continue
+        log.info('%10d %s', size, name)
+        if depth and os.path.isdir(path):
+            _logDirListingNoScandir(path, depth-1)
+            pass
+        continue
+    return
+
+
+def _stageWorkers(nTasks):
+    """@brief Number of concurrent stage copies, from $GPL_STAGE_WORKERS."""
+    try:
+        workers = int(os.environ.get('GPL_STAGE_WORKERS', defaultStageWorkers))
+    except ValueError:
+        workers = defaultStageWorkers
+    return max(1, min(workers, nTasks))
+
+
+def _runConcurrently(calls):
+    """@brief Run no-argument callables, OR'ing their return codes.
+    The calls are independent and I/O bound, so a small thread pool
+    overlaps their disk/network latency; with one call (or on Python 2,
+    which has no executor) the loop stays serial.
+    """
+    rc = 0
+    workers = _stageWorkers(len(calls))
+    if futures is None or workers < 2:
+        for call in calls:
+            rc |= call()
+            continue
+        return rc
+    pool = futures.ThreadPoolExecutor(max_workers=workers)
+    try:
+        for result in pool.map(lambda call: call(), calls):
+            rc |= result
+            continue
+    finally:
+        pool.shutdown()
+    return rc
+
+class _PrefixFilter:
+    """@brief search()-compatible matcher for '^literal' patterns.
+    Covers the default AFS filter without dragging in the re module for
+    the many short-lived batch jobs that never use a custom pattern.
+    """
+    def __init__(self, prefix):
+        self.prefix = prefix
+    def search(self, text):
+        return text.startswith(self.prefix) or None
+
+
+## The AFS filter is the default for every StageSet; build its matcher
+## once at module load so stageIn/stageOut pay nothing per file.
+_filterAfsMatcher = _PrefixFilter('/afs/')
+
+
+def _compileFilter(pattern):
+    """@brief Compile an exclusion pattern once, or return None for no filter.
+    re is only imported when a caller supplies a non-default pattern.
+    """
+    if not pattern: return None
+    if pattern == filterAfs: return _filterAfsMatcher
+    import re
+    return re.compile(pattern)
+
+
+##
+## defaultStageAreas defines all possible machine-local stage
+## directories/partitions:
+##
+## SLAC batch machines all have /scratch for this purpose
+## Newer SLAC batch machines have /lustre/ki/pfs/fermi_scratch
+## Desktop machines may or may not have /scratch
+## Public machines (norics) do not have /scratch (only /tmp)
+
+defaultStageAreas = ["/scratch", "/tmp"]
+
+lustreStageArea = ["/lustre/ki/pfs/fermi_scratch"]  ## 5/9/2013 (may change!)
+
+
+def _selectStageArea(stageArea, lustre):
+    """@brief Pick the staging root directory.
+    Priorities:
+     1     $GPL_STAGEROOTDEV (if defined)
+     2     Constructor argument
+     3     $GPL_STAGEROOT (if defined)
+     4     Selection from hard-wired default list
+    Falls back to $PWD if nothing else is usable.
+    """
+    candidates = (
+        ('$GPL_STAGEROOTDEV', os.environ.get('GPL_STAGEROOTDEV')),
+        ('constructor argument', stageArea),
+        ('$GPL_STAGEROOT', os.environ.get('GPL_STAGEROOT')),
+        )
+    for origin, candidate in candidates:
+        if candidate is not None:
+            log.debug('stageArea defined from %s: %s', origin, candidate)
+            return candidate
+        continue
+    return _defaultStageArea(lustre)
+
+
+## The default areas are fixed paths, so which one is usable can't
+## change within a process; probe them once and remember the answer.
+_defaultAreaCache = {}
+
+
+def _defaultStageArea(lustre):
+    """@brief First usable entry from the hard-wired default list,
+    memoized per process."""
+    area = _defaultAreaCache.get(lustre)
+    if area is not None:
+        log.debug('stageArea from default list (cached): %s', area)
+        return area
+    area = _probeDefaultAreas(lustre)
+    _defaultAreaCache[lustre] = area
+    return area
+
+
+def _probeDefaultAreas(lustre):
+    defaults = defaultStageAreas
+    if lustre: defaults = lustreStageArea + defaults
+    for x in defaults:
+        if os.access(x,os.W_OK):        # Does stageArea already exist?
+            log.debug("Successful access of %s", x)
+            log.debug('stageArea defined from default list: %s', x)
+            return x
+        try:                            # Try to create stageArea
+            fileOps.makedirs(x)
+            log.debug("Successful creation of %s", x)
+            log.debug('stageArea defined from default list: %s', x)
+            return x
+        except OSError:
+            log.warning("Staging cannot use %s", x)
+            continue
+        continue
+    # No luck, revert to $PWD
+    return os.environ.get('PWD', os.getcwd())
 
 class StageSet:
 
@@ -74,82 +265,28 @@ class StageSet:
         log.debug("Entering stageFiles constructor...")
         self.setupFlag = 0
         self.setupOK = 0
+        self._ready = False
 
         self.excludeIn = excludeIn
         self.excludeOut = excludeOut
+        self._excludeInRe = _compileFilter(excludeIn)
+        self._excludeOutRe = _compileFilter(excludeOut)
         self.autoStart = autoStart
-        
-        ##
-        ## defaultStageAreas defines all possible machine-local stage
-        ## directories/partitions:
-        ##
-        ## SLAC batch machines all have /scratch for this purpose
-        ## Newer SLAC batch machines have /lustre/ki/pfs/fermi_scratch
-        ## Desktop machines may or may not have /scratch
-        ## Public machines (norics) do not have /scratch (only /tmp)
-
-        defaultStageAreas=["/scratch","/tmp"]
 
-        lustreStageArea = ["/lustre/ki/pfs/fermi_scratch"]  ## 5/9/2013 (may change!)
-        if lustre: defaultStageAreas = lustreStageArea + defaultStageAreas
-
-        ##
         ## Construct path to staging area
-        ## Priorities:
-        ##  1     $GPL_STAGEROOTDEV (if defined)
-        ##  2     Constructor argument
-        ##  3     $GPL_STAGEROOT (if defined)
-        ##  4     Selection from hard-wired default list
-        try:
-            envvarStageAreaDev = os.environ['GPL_STAGEROOTDEV']
-            stageArea = envvarStageAreaDev
-            log.debug('stageArea defined from $GPL_STAGEROOTDEV: '+stageArea)
-        except KeyError:
-            if stageArea is None:
-                try:
-                    envvarStageArea = os.environ['GPL_STAGEROOT']
-                    stageArea = envvarStageArea
-                    log.debug('stageArea defined from $GPL_STAGEROOT: '+stageArea)
-                except KeyError:
-                    for x in defaultStageAreas:
-                        if os.access(x,os.W_OK):        # Does stageArea already exist?
-                            log.debug("Successful access of "+x)
-                            stageArea=x
-                            log.debug('stageArea defined from default list: '+stageArea)
-                            break
-                        
-                        else:                           # Try to create stageArea
-                            try:
-                                rc = fileOps.makedirs(x)
-                                stageArea=x
-                                log.debug("Successful creation of "+x)
-                                log.debug('stageArea defined from default list: '+stageArea)
-                                break
-                            except:                     # No luck, revert to $PWD
-                                log.warning("Staging cannot use "+x)
-                                stageArea=os.environ['PWD']
-                                pass
-                            pass
-                        pass
-                    pass
-                pass
-            
-            else:
-                log.debug('stageArea defined by constructor argument: '+stageArea)
-                pass
-                    
-        log.debug("Selected staging root directory = "+stageArea)
+        stageArea = _selectStageArea(stageArea, lustre)
+        log.debug("Selected staging root directory = %s", stageArea)
 
         if stageName is None:
-            stageName = `os.getpid()`    # aim for something unique if not specified
+            stageName = str(os.getpid())    # aim for something unique if not specified
             pass
  
         self.stageDir = os.path.join(stageArea, stageName)
-        log.debug('Targeted staging directory = '+self.stageDir)
+        log.debug('Targeted staging directory = %s', self.stageDir)
         self.setup()
 
         if strictSetup and not self.setupOK:
-            raise OSError, "Couldn't setup staging!"
+            raise OSError("Couldn't setup staging!")
 
         return
 
@@ -159,46 +296,73 @@ class StageSet:
 
         log.debug("Entering stage setup...")
 
-        stageExists = os.access(self.stageDir,os.F_OK)
-        log.debug("os.access = "+`stageExists`)
-
-        ## Check if requested staging directory already exists and, if
-        ## not, try to create it
-        if stageExists:
-            log.info("Requested stage directory already exists: "+self.stageDir)
-            self.setupOK=1
-            self.listStageDir()
-        else:
-            try:
-                rc = fileOps.makedirs(self.stageDir)
-                self.setupOK=1
-                log.debug("Successful creation of "+self.stageDir)
-            except OSError:
-                log.warning('Staging disabled: error from makedirs: '+self.stageDir)
-                self.stageDir=""
-                self.setupOK=0
+        ## fileOps.makedirs tolerates an existing directory, so a single
+        ## EAFP call replaces the old access-then-create pair along with
+        ## its race window.
+        try:
+            if self._acquirePooledDir():
+                log.debug("Reusing pooled staging directory: %s", self.stageDir)
+            else:
+                fileOps.makedirs(self.stageDir)
                 pass
+            self.setupOK=1
+            log.debug("Staging directory ready: %s", self.stageDir)
+        except OSError:
+            log.warning('Staging disabled: error from makedirs: %s', self.stageDir)
+            self.stageDir=""
+            self.setupOK=0
             pass
-        
-        log.debug("os.access = "+`os.access(self.stageDir,os.F_OK)`)
-            
+
+        ## Remember which filesystem the stage directory lives on, so
+        ## stageIn/stageOut can recognize files already there and skip
+        ## the pointless copy to the same disk.
+        try:
+            self._stageDev = os.stat(self.stageDir).st_dev
+        except OSError:
+            self._stageDev = None
+            pass
+
         ## Initialize file staging bookkeeping
         self.reset()
         self.setupFlag = 1
+        ## _ready mirrors "setupFlag == 1 and setupOK == 1" so the
+        ## per-file entry points test one attribute instead of two
+        self._ready = (self.setupOK == 1)
         return
 
 
     def reset(self):
         """@brief Initialize internal dictionaries/lists/counters
-        (intended as a private function)"""
-        self.stagedFiles = []
+        (intended as a private function).
+        Containers are emptied in place rather than replaced, so sets
+        that stage files in waves reuse the same objects instead of
+        churning the allocator every finish('clean')."""
+        try:
+            del self.stagedFiles[:]
+            self._nameCache.clear()
+            self._modePrefix.clear()
+        except AttributeError:      # first call, from setup()
+            self.stagedFiles = []
+            self._nameCache = {}
+            self._modePrefix = {}
+            pass
         self.numIn=0
         self.numOut=0
         self.numMod=0
         self.xrootdIgnoreErrors = False
 
+    def _onStageDev(self, path):
+        """@brief True if path is on the same filesystem as the stage
+        directory, in which case staging it is pure overhead."""
+        if self._stageDev is None: return False
+        if fileOps.isOnXrootd(path): return False
+        try:
+            return os.stat(path).st_dev == self._stageDev
+        except OSError:
+            return False
+
     def xrootdIgnore(self,flag):
-        log.info("Setting xrootdIgnoreErrors to "+str(flag))
+        log.info("Setting xrootdIgnoreErrors to %s", flag)
         self.xrootdIgnoreErrors = flag
 
     def stageIn(self, inFile):
@@ -206,21 +370,27 @@ class StageSet:
         @param inFile real name of the input file
         @return name of the staged file
         """
-        if self.setupFlag <> 1: self.setup()
+        if not self._ready:
+            if self.setupFlag != 1: self.setup()
+            if not self._ready:
+                log.warning("Stage IN not available for: %s", inFile)
+                return inFile
+            pass
 
-        if self.setupOK <> 1:
-            log.warning("Stage IN not available for: "+inFile)
-            return inFile
-        elif self.excludeIn and re.search(self.excludeIn, inFile):
+        if self._excludeInRe and self._excludeInRe.search(inFile):
             log.info("Staging disabled for file '%s' by pattern '%s'." %
                      (inFile, self.excludeIn))
             return inFile
+        elif self._onStageDev(inFile):
+            log.debug('%s already on the staging filesystem, not staging',
+                      inFile)
+            return inFile
         else:
             cleanup = True
             stageName = self.stagedName(inFile,mode="IN")
             pass
         
-        log.info("\nstageIn for: "+inFile)
+        log.info("\nstageIn for: %s", inFile)
 
         inStage = StagedFile(stageName, source=inFile,
                              cleanup=cleanup, autoStart=self.autoStart)
@@ -230,13 +400,31 @@ class StageSet:
 
         return stageName
 
-    
+
+    def stageInMany(self, inFiles):
+        """@brief Stage several input files with their copies overlapped.
+        @param inFiles sequence of real input file names
+        @return dict mapping each input name to its staged name
+        Bookkeeping runs on the calling thread; only the copies go
+        through the thread pool (via start), so no locking is needed.
+        """
+        autoStart = self.autoStart
+        self.autoStart = False
+        try:
+            staged = dict((inFile, self.stageIn(inFile))
+                          for inFile in inFiles)
+        finally:
+            self.autoStart = autoStart
+        if autoStart: self.start()
+        return staged
+
+
     def stageOut(self, *args):
         """@brief Stage an output file.
         @param outFile [...] = real name(s) of the output file(s)
         @return name of the staged file
         """
-        if self.setupFlag <> 1: setup()
+        if not self._ready and self.setupFlag != 1: self.setup()
 
 ## Build stage file map even if staging is disabled - so that copying
 ## to possible 2nd target (e.g., xrootd) will still take place
@@ -248,23 +436,29 @@ class StageSet:
         outFile = args[0]
         destinations = args
 
-        if self.setupOK <> 1:
-            log.warning("Stage OUT not available for "+outFile)
+        if not self._ready:
+            log.warning("Stage OUT not available for %s", outFile)
             stageName = outFile
             cleanup = False
-        elif self.excludeOut and re.search(self.excludeOut, outFile):
+        elif self._excludeOutRe and self._excludeOutRe.search(outFile):
             log.info("Staging disabled for file '%s' by pattern '%s'." %
                      (outFile, self.excludeOut))
             stageName = outFile
             cleanup = False
+        elif len(destinations) == 1 and \
+                 self._onStageDev(os.path.dirname(outFile) or '.'):
+            # the "staged" copy would land on the same filesystem as the
+            # final destination; write the real file directly instead
+            log.debug('%s already on the staging filesystem, not staging',
+                      outFile)
+            stageName = outFile
+            cleanup = False
         else:
             stageName = self.stagedName(outFile,mode='OUT')
-            path = os.path.dirname(stageName)
-            if not os.access(path,os.F_OK):
-                log.info("Creating "+path)
-                rc = fileOps.makedirs(path)
-                pass
-            log.info("\nstageOut for: "+outFile)
+            ## makedirs tolerates an existing directory, so no need to
+            ## probe with os.access first
+            fileOps.makedirs(os.path.dirname(stageName))
+            log.info("\nstageOut for: %s", outFile)
             cleanup = True
             pass
 
@@ -277,6 +471,17 @@ class StageSet:
         return stageName
 
 
+    def stageOutMany(self, outFiles):
+        """@brief Register several output files.
+        @param outFiles sequence of real output file names
+        @return dict mapping each output name to its staged name
+        The copies to the final destinations happen at finish(), which
+        already runs them concurrently.
+        """
+        return dict((outFile, self.stageOut(outFile))
+                    for outFile in outFiles)
+
+
 
 
 
@@ -288,12 +493,14 @@ class StageSet:
         @param modFile real name of the target file
         @return name of the staged file
         """
-        if self.setupFlag <> 1: self.setup()
+        if not self._ready:
+            if self.setupFlag != 1: self.setup()
+            if not self._ready:
+                log.warning("Stage MOD not available for: %s", modFile)
+                return modFile
+            pass
 
-        if self.setupOK <> 1:
-            log.warning("Stage MOD not available for: "+modFile)
-            return modFile
-        elif self.excludeIn and re.search(self.excludeIn, modFile):
+        if self._excludeInRe and self._excludeInRe.search(modFile):
             log.info("Staging disabled for file '%s' by pattern '%s'." %
                      (modFile, self.excludeIn))
             return modFile
@@ -302,7 +509,7 @@ class StageSet:
             stageName = self.stagedName(modFile,mode='MOD')
             pass
         
-        log.info("\nstageMod for: "+modFile)
+        log.info("\nstageMod for: %s", modFile)
 
         modStage = StagedFile(stageName, source=modFile, destinations=[modFile],
                              cleanup=cleanup, autoStart=self.autoStart)
@@ -323,11 +530,34 @@ class StageSet:
 
 
     def start(self):
-        rc = 0
-        for stagee in self.stagedFiles:
-            rc |= stagee.start()
-            continue
-        return rc
+        """@brief Start every staged file; with autoStart off this is
+        where the stage-in copies happen, several in flight at once."""
+        return _runConcurrently(
+            [stagee.start for stagee in self.stagedFiles])
+
+
+### asyncio flavors: POSIX has no real async file I/O, so these hand the
+### blocking calls to the event loop's executor.  Await them from a
+### running loop; the synchronous API stays the primary one.
+
+    def stageInAsync(self, inFile):
+        """@brief Awaitable stageIn; the copy runs on the loop's executor."""
+        import asyncio
+        return asyncio.get_running_loop().run_in_executor(
+            None, self.stageIn, inFile)
+
+    def stageInManyAsync(self, inFiles):
+        """@brief Stage several inputs concurrently.
+        Awaiting the result gives the staged names in input order.
+        """
+        import asyncio
+        return asyncio.gather(*[self.stageInAsync(f) for f in inFiles])
+
+    def finishAsync(self, option=""):
+        """@brief Awaitable finish(); see finish for the option values."""
+        import asyncio
+        return asyncio.get_running_loop().run_in_executor(
+            None, self.finish, option)
     
 
 
@@ -339,7 +569,7 @@ class StageSet:
         <null>  - +remove stage directories (full cleanup)
         wipe    - remove stage directories WITHOUT copying staged files to destination
         """
-        log.debug('Entering stage.finish('+option+')')
+        log.debug('Entering stage.finish(%s)', option)
         rc = 0     # overall
 
         keep = False
@@ -352,18 +582,20 @@ class StageSet:
         if option == 'wipe':
             log.info(
                 'Deleting staging directory without retrieving output files.')
-            if self.setupOK <> 0:
+            if self.setupOK != 0:
                 return self._removeDir()
             pass
         elif option == 'keep':
             keep = True
             pass
 
-        # copy stageOut files to their final destinations
-        for stagee in self.stagedFiles:
-            rc |= stagee.finish(keep)
-            continue
-    
+        # copy stageOut files to their final destinations.  On the full
+        # cleanup path the whole stage directory is about to be deleted,
+        # so skip the file-at-a-time removal of staged copies and let
+        # one bulk rmtree take them all.
+        bulk = option not in ('keep', 'clean') and self.setupOK != 0
+        rc |= self._finishAll(keep, removeStaged=not bulk)
+
         if option == "keep": return rc              # Early return #1
 
         # Initialize stage data structures
@@ -373,37 +605,104 @@ class StageSet:
         if option == "clean": return rc           # Early return #2
                             
         # remove stage directory (unless staging is disabled)
-        if self.setupOK <> 0:
+        if self.setupOK != 0:
             rc |= self._removeDir()
             pass
         
         self.setupFlag=0
         self.setupOK=0
+        self._ready = False
         self.reset()
  
         return rc
 
 
+    def _finishAll(self, keep, removeStaged=True):
+        """@brief Finish every staged file, concurrently when possible.
+        removeStaged=False defers removal of the staged copies to the
+        caller's bulk directory delete.
+        """
+        def finisher(stagee):
+            return lambda: stagee.finish(keep, removeStaged)
+        return _runConcurrently(
+            [finisher(stagee) for stagee in self.stagedFiles])
+
+
+    def _acquirePooledDir(self):
+        """@brief Rename an empty directory from the pool to self.stageDir.
+        os.rename is atomic, so concurrent jobs racing for the same pool
+        entry can't both get it; the loser just tries the next one.
+        Returns True if a pooled directory was claimed.
+        """
+        pool = os.path.join(os.path.dirname(self.stageDir), poolDirName)
+        try:
+            names = os.listdir(pool)
+        except OSError:          # no pool yet
+            return False
+        for name in names:
+            try:
+                os.rename(os.path.join(pool, name), self.stageDir)
+                return True
+            except OSError:      # lost the race for this entry
+                continue
+        return False
+
+
+    def _releasePooledDir(self):
+        """@brief Park the emptied stage directory in the pool for reuse.
+        Leftover staged copies are expected here - the full-cleanup path
+        defers their removal to this bulk step - and are unlinked before
+        pooling; anything unexpected (a nested directory) bails out to
+        the rmtree fallback.  The IN/OUT/MOD mode directories stay:
+        empty, they are part of what's worth reusing.  The pool is
+        capped so an unusual burst of jobs can't fill the staging area
+        with husks.  Returns True if the directory was pooled.
+        """
+        global _poolSeq
+        pool = os.path.join(os.path.dirname(self.stageDir), poolDirName)
+        try:
+            for name in os.listdir(self.stageDir):
+                path = os.path.join(self.stageDir, name)
+                if os.path.isdir(path):
+                    for leaf in os.listdir(path):
+                        leafPath = os.path.join(path, leaf)
+                        if os.path.isdir(leafPath): return False
+                        os.remove(leafPath)
+                        continue
+                else:
+                    os.remove(path)
+                continue
+            try:
+                fileOps.makedirs(pool)
+            except OSError:
+                pass
+            if len(os.listdir(pool)) >= maxPoolSize: return False
+            _poolSeq += 1
+            parked = os.path.join(pool, '%d-%d' % (os.getpid(), _poolSeq))
+            os.rename(self.stageDir, parked)
+        except OSError:
+            return False
+        return True
+
+
     def _removeDir(self):
 
         rc = 0
 
         # remove stage directory (unless staging is disabled)
-        if self.setupOK <> 0:
-            try:
-                fileOps.rmdir(self.stageDir)
-                log.info("Removed staging directory "+str(self.stageDir))
-                rc = 0
-            except:
-                log.warning("Staging directory not empty after cleanup!!")
-                log.warning("Content of staging directory "+self.stageDir)
-                os.system('ls -l '+self.stageDir)
-                log.warning("*** All files & directories will be deleted! ***")
+        if self.setupOK != 0:
+            if self._releasePooledDir():
+                log.info("Returned staging directory %s to pool",
+                         self.stageDir)
+            else:
+                # one bulk delete takes leftover staged copies and the
+                # directory itself
                 try:
-                    fileOps.rmtree(self.stageDir)
-                    rc = 0
-                except:
-                    log.error("Could not remove stage directory, "+self.stageDir)
+                    if fileOps.rmtree(self.stageDir):
+                        raise OSError("rmtree left %s" % self.stageDir)
+                    log.info("Removed staging directory %s", self.stageDir)
+                except (OSError, IOError):
+                    log.error("Could not remove stage directory, %s", self.stageDir)
                     rc = 2
                     pass
                 pass
@@ -412,6 +711,7 @@ class StageSet:
     
         self.setupFlag=0
         self.setupOK=0
+        self._ready = False
         self.reset()
  
         return rc
@@ -422,9 +722,22 @@ class StageSet:
         """@brief Generate names of staged files.
         @param fileName Real name of file.
         @return Name of staged file.
+        Results are memoized, so re-staging the same file skips the
+        path parsing.
         """
-        base = os.path.basename(fileName)
-        stageName = os.path.join(self.stageDir, mode, base)
+        key = (fileName, mode)
+        stageName = self._nameCache.get(key)
+        if stageName is None:
+            ## the '<stageDir>/<mode>/' prefix is the same for every
+            ## file in a mode; build it once and concatenate
+            prefix = self._modePrefix.get(mode)
+            if prefix is None:
+                prefix = os.path.join(self.stageDir, mode, '')
+                self._modePrefix[mode] = prefix
+                pass
+            stageName = prefix + os.path.basename(fileName)
+            self._nameCache[key] = stageName
+            pass
         return stageName
 
 
@@ -433,37 +746,41 @@ class StageSet:
 
 
     def getChecksums(self,printflag=None):
-        """@brief Return a dictionary of: [stagedOut file name,[length,checksum] ].  Call this after creating file(s), but before finish(), if at all.  If the printflag is set to 1, a brief report will be sent to stdout."""
+        """@brief Return a dictionary of: [stagedOut file name,(checksum,length)].  Call this after creating file(s), but before finish(), if at all.  If the printflag is set to 1, a brief report will be sent to stdout.
+
+        Checksums are CRC-32 (zlib), computed in-process in a single
+        buffered read of each file and cached on the StagedFile, so
+        repeated calls don't re-read the data."""
         cksums = {}
         # Compute checksums for all stagedOut files
         log.info("Calculating 32-bit CRC checksums for stagedOut files")
         for stagee in self.stagedFiles:
             if len(stagee.destinations) != 0:
                 file = stagee.location
-                if os.access(file,os.R_OK):
-                    cksum = "cksum "+file
-                    fd = os.popen(cksum,'r')    # Capture output from unix command
-                    foo = fd.read()             # Calculate checksum
-                    rc = fd.close()
-                    if rc != None:
-                        log.warning("Checksum error: return code =  "+str(rc)+" for file "+file)
-                    else:
-                        cksumout = foo.split()
-                        cksums[cksumout[2]] = [cksumout[0],cksumout[1]]
+                if stagee._crc is None:
+                    try:
+                        stagee._crc = fileOps.getSum(file)
+                    except (IOError, OSError):
+                        stagee._crc = None
                         pass
+                    pass
+                if stagee._crc is None:
+                    log.warning("Checksum error: could not read file, %s", file)
                 else:
-                    log.warning("Checksum error: file does not exist, "+file)
+                    # (crc, size) comes back as a tuple already; store it
+                    # as-is rather than allocating a fresh list per file.
+                    cksums[file] = stagee._crc
                     pass
                 pass
             continue
 # Print report, if requested
-        if int(printflag) == 1:
+        if printflag and int(printflag) == 1:
             log.info("Checksum report")
-            print "\n"
+            print("\n")
             for cksum in cksums:
-                print "Checksum report for file: ",cksum," checksum=",cksums[cksum][0]," bytes=",cksums[cksum][1]
+                print("Checksum report for file: ", cksum, " checksum=", cksums[cksum][0], " bytes=", cksums[cksum][1])
                 pass
-            print "\n"
+            print("\n")
             pass
         return cksums
 
@@ -479,11 +796,9 @@ class StageSet:
     def listStageDir(self):
         """@brief List contents of current staging directory"""
         if self.setupOK == 0: return
-        log.info("\nContents of stage directory \n ls -laF "+self.stageDir)
-        rc1 = os.system('ls -laF '+self.stageDir)
-        log.info("\nContents of stage sub-directories \n ls -laF "+self.stageDir+'/*')
-        subdirs = os.path.join(self.stageDir,'*')
-        rc2 = os.system('ls -laF '+subdirs)
+        if not log.isEnabledFor(logging.INFO): return
+        log.info("\nContents of stage directory %s", self.stageDir)
+        _logDirListing(self.stageDir)
         return
 
 
@@ -498,21 +813,23 @@ class StageSet:
 
     def dumpStagedFiles(self):
         """@brief Dump names of staged files to stdout"""
+        if not log.isEnabledFor(logging.INFO): return
         log.info('\n\n\tStatus of File Staging System')
-        log.info('setupFlag= '+str(self.setupFlag)+', setupOK= '+str(self.setupOK)+', stageDirectory= '+str(self.stageDir)+'\n')
-        log.info(str(self.numIn)+" files being staged in")
-        log.info(str(self.numOut)+" files being staged out")
-        log.info(str(self.numMod)+" files being staged in/out for modification\n")
-
-        # copy stageOut files to their final destinations
-        for stagee in self.stagedFiles:
-            stagee.dumpState()
-            continue
+        log.info('setupFlag= %s, setupOK= %s, stageDirectory= %s\n',
+                 self.setupFlag, self.setupOK, self.stageDir)
+        log.info("%d files being staged in", self.numIn)
+        log.info("%d files being staged out", self.numOut)
+        log.info("%d files being staged in/out for modification\n", self.numMod)
+
+        ## one record for the whole table rather than one per line
+        if self.stagedFiles:
+            log.info('%s', '\n'.join(
+                stagee.stateString() for stagee in self.stagedFiles))
         return
 
     def dumpFileList(self, mylist):
         """@brief Dummy for backward compatibility"""
-        print "Entering dumpFileList (dummy method)"
+        print("Entering dumpFileList (dummy method)")
         return
 
 
@@ -520,6 +837,12 @@ class StageSet:
 
 class StagedFile(object):
 
+    ## Large stage sets hold one of these per file; slots keep the
+    ## records compact and make attribute access in the start/finish
+    ## loops a fixed-offset load instead of a dict lookup.
+    __slots__ = ('source', 'location', 'destinations', 'cleanup', 'started',
+                 '_crc')
+
     def __init__(self, location, source=None, destinations=[],
                  cleanup=False, autoStart=True):
         self.source = source                   # (stageIn) original file location
@@ -527,6 +850,7 @@ class StagedFile(object):
         self.destinations = list(destinations) # (stageOut) list of final destinations for file
         self.cleanup = cleanup                 # cleanup=>remove file at finish()
         self.started = False                   # (stageIn) file has been copied to scratch area
+        self._crc = None                       # cached (crc, size) from getChecksums
         if location in self.destinations:      # prevent shooting self in foot
             self.destinations.remove(location)
             self.cleanup = False
@@ -534,46 +858,116 @@ class StagedFile(object):
         if autoStart:                          # cause files to be stagedIn
             self.start()
             pass
-        self.dumpState()
         return
 
+    def stateString(self):
+        """@brief One-line summary of this record."""
+        return ('StagedFile 0x%x: source=%s location=%s destinations=%s'
+                ' cleanup=%s started=%s' %
+                (id(self), self.source, self.location, self.destinations,
+                 self.cleanup, self.started))
+
     def dumpState(self):
-        log.info('StagedFile 0x%x' % id(self))
-        log.info('source: %s' % self.source)
-        log.info('location: %s' % self.location)
-        log.info('destinations: %s' % self.destinations)
-        log.info('cleanup: %s' % self.cleanup)
-        log.info('started: %s' % self.started)
+        if not log.isEnabledFor(logging.INFO): return
+        log.info('%s', self.stateString())
         return
 
     def start(self):                   # copy stagedIn file to temporary working area
-        self.dumpState()
+        log.debug('stage start %s -> %s', self.source, self.location)
         rc = 0
         if self.source and self.location != self.source and not self.started:
-            rc = fileOps.copy(self.source, self.location)
+            if not self._linkIn():
+                rc = fileOps.copy(self.source, self.location)
+                pass
             pass
         if rc:
-            raise IOError, "Can't stage in %s" % self.source
+            raise IOError("Can't stage in %s" % self.source)
         self.started = True
         return rc
 
-    def finish(self, keep=False):      # copy stagedOut file to final destination(s) & cleanup
-        self.dumpState()
+    def _linkIn(self):
+        """@brief Hard-link the source into the staging area when both live
+        on the same filesystem: O(1) metadata, zero bytes moved.
+        Only safe for pure stage-IN; stageMod files (destinations lists
+        the source) must get a real copy so in-place edits can't corrupt
+        the original.  stageIn's same-device early return normally hands
+        such sources back unstaged before a record is created, making
+        this path redundant - it is kept for the case where setup()
+        could not stat the stage directory (self._stageDev is None), in
+        which case _onStageDev answers False and same-device sources
+        still reach here.  Returns True if the link was made.
+        """
+        if self.destinations: return False
+        if fileOps.isOnXrootd(self.source) or fileOps.isOnXrootd(self.location):
+            return False
+        try:
+            fileOps.mkdirFor(self.location)
+            if os.stat(self.source).st_dev != \
+                   os.stat(os.path.dirname(self.location)).st_dev:
+                return False
+            os.link(self.source, self.location)
+        except (OSError, AttributeError):  # cross-device, perms, or no link()
+            return False
+        log.info('Hard-linked %s to %s', self.source, self.location)
+        return True
+
+    def _linkOut(self, dest, keep=False):
+        """@brief Hard-link the staged copy to its destination when both
+        live on the same filesystem; with the cleanup unlink of the
+        staged name that amounts to a constant-time move.  Restricted
+        to records whose staged copy is about to go away, so a published
+        file never keeps sharing an inode with one the job still owns;
+        finish('keep') retains the staged copy, so it must take a real
+        copy.  Also restricted to single-destination records: linking a
+        fan-out would leave the published destinations sharing one
+        inode with each other, so those take real copies too.
+        Returns True if the link was made.
+        """
+        if keep or not self.cleanup: return False
+        if len(self.destinations) != 1: return False
+        if fileOps.isOnXrootd(self.location) or fileOps.isOnXrootd(dest):
+            return False
+        try:
+            fileOps.mkdirFor(dest)
+            if os.stat(self.location).st_dev != \
+                   os.stat(os.path.dirname(dest) or '.').st_dev:
+                return False
+            fileOps.remove(dest)    # replace any previous version
+            os.link(self.location, dest)
+        except (OSError, AttributeError):  # cross-device, perms, or no link()
+            return False
+        log.info('Hard-linked %s to %s', self.location, dest)
+        return True
+
+    def finish(self, keep=False, removeStaged=True):
+        # copy stagedOut file to final destination(s) & cleanup
+        log.debug('stage finish %s -> %s', self.location, self.destinations)
         rc = 0
         if not 'SCRATCH' in self.destinations:
             for dest in self.destinations:
+                if self._linkOut(dest, keep): continue
                 rc |= fileOps.copy(self.location, dest)
                 continue
             pass
         else:
-            log.info('File declared scratch, not copying to destination: '+self.destinations[0])
+            log.info('File declared scratch, not copying to destination: %s', self.destinations[0])
             pass
-        
-        if not keep and self.cleanup and os.access(self.location, os.W_OK):
-            log.info('Nuking %s' % self.location)
-            fileOps.remove(self.location)
+
+        if not removeStaged:
+            # the whole stage directory is about to be bulk-deleted
+            return rc
+
+        if not keep and self.cleanup:
+            # Just try the removal rather than asking os.access first:
+            # one syscall instead of two, and no TOCTOU window.
+            log.info('Nuking %s', self.location)
+            try:
+                fileOps.remove(self.location)
+            except OSError as e:
+                log.warning('Could not remove %s: %s', self.location, e)
+                pass
         else:
-            log.info('Not nuking %s' % self.location)
+            log.info('Not nuking %s', self.location)
             pass
         return rc
     pass
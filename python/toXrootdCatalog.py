@@ -40,7 +40,10 @@
 ##
 ## Preliminaries
 ##
+from __future__ import print_function
+
 import os
+import subprocess
 import sys
 import math
 import stat
@@ -48,7 +51,7 @@ from optparse import OptionParser
 
 
 
-print "\n\n\n\n\n\t\t*****************************\n\t\t* Entering toXrootdCatalog.py *\n\t\t*****************************\n\n"
+print("\n\n\n\n\n\t\t*****************************\n\t\t* Entering toXrootdCatalog.py *\n\t\t*****************************\n\n")
 sys.stdout.flush()
 
 
@@ -85,13 +88,13 @@ group = options.group
 executeThis = options.execute
 
 xrootRedirector = 'root://glast-rdr.slac.stanford.edu//glast/'
-xrdcpLoc = '/afs/slac/g/glast/applications/xrootd/PROD/bin/xrdcp '
+xrdcpLoc = '/afs/slac/g/glast/applications/xrootd/PROD/bin/xrdcp'
 
 ##
 ## Check existence of the input file
 
 if int(os.access(inputFile,os.R_OK)) != 1:
-    print 'Failed to access file '+inputFile
+    print('Failed to access file '+inputFile)
     exit(1)
 
 
@@ -99,38 +102,33 @@ if int(os.access(inputFile,os.R_OK)) != 1:
 
 
 xrootFilePath = xrootRedirector + xrootPath + '/' + inputFileName
-cmdXrootd = xrdcpLoc + ' -f ' + inputFile + ' ' + xrootFilePath
+## argv list: no shell in between, no quoting surprises
+cmdXrootd = [xrdcpLoc, '-f', inputFile, xrootFilePath]
 
 if executeThis == 'yes':
-    fd = os.popen(cmdXrootd);
-    foo = fd.read()
-    rc = fd.close()
-##    print 'Machine info:\n'+foo+'\n'
-    if rc != None:
-        print 'xrootd is not happy! Contact wilko@slac.stanford.edu\n'
+    rc = subprocess.call(cmdXrootd)
+    if rc != 0:
+        print('xrootd is not happy! Contact wilko@slac.stanford.edu\n')
         exit(1)
 else:
-    print 'Test prep of xrootd copy: ' + cmdXrootd
+    print('Test prep of xrootd copy: ' + ' '.join(cmdXrootd))
 
 ## register the file in the catalogue
 
-datacatLoc = '/afs/slac.stanford.edu/g/glast/ground/bin/datacat '
-useMeta = ''
-if metaData != 'null': 
-    useMeta = '-D s"' + metaData + '"'
-    
-cmdDatacat = datacatLoc + 'registerDataset -G  ' + group + ' ' + useMeta + ' -S SLAC_XROOT ' + inputFileType + ' ' + datacatPath + ' ' + xrootFilePath
+datacatLoc = '/afs/slac.stanford.edu/g/glast/ground/bin/datacat'
+
+cmdDatacat = [datacatLoc, 'registerDataset', '-G', group]
+if metaData != 'null':
+    ## same argument the shell quoting used to produce: s<metadata>
+    cmdDatacat += ['-D', 's' + metaData]
+cmdDatacat += ['-S', 'SLAC_XROOT', inputFileType, datacatPath, xrootFilePath]
 
 if executeThis == 'yes':
-    fd = os.popen(cmdDatacat)    # register the file in the data catalogue
-    foo = fd.read()
-    rc = fd.close()
-##    print 'Machine info:\n'+foo+'\n'
-##    print rc
-    if rc != None:
-        print ' data catalogue registration is not happy! Contact dflath@slac.stanford.edu\n'
+    rc = subprocess.call(cmdDatacat)    # register the file in the data catalogue
+    if rc != 0:
+        print(' data catalogue registration is not happy! Contact dflath@slac.stanford.edu\n')
         exit(2)
 else:
-    print 'Test prep of datacat registration: ' + cmdDatacat
+    print('Test prep of datacat registration: ' + ' '.join(cmdDatacat))
 
     
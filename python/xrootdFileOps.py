@@ -2,21 +2,70 @@
 """
 
 import os
+import subprocess
+import time
 
 import runner
 
+_timer = getattr(time, 'monotonic', time.time)
+
 xrootStart = "root:"
 xrootdLocation = os.getenv("GPL_XROOTD_DIR","/afs/slac.stanford.edu/g/glast/applications/xrootd/PROD/bin")
-xrdcp    = xrootdLocation+"/xrdcp "
-xrdstat  = xrootdLocation+"/xrd.pl -w stat "
-xrdrm    = xrootdLocation+"/xrd.pl rm "
+xrdcp    = xrootdLocation+"/xrdcp"
 xrd      = xrootdLocation+"/xrd.pl"
 
+## Give up on a single transfer after this long rather than hanging a
+## batch job on a wedged server (Python 3 only; no-op on 2).
+copyTimeout = 600
+
+## Prefer the in-process xrootd client bindings when they are
+## installed: one authenticated session instead of a fork + TCP
+## handshake + auth per transfer.  Everything falls back to the
+## command-line tools where the bindings are missing.
+try:
+    from XRootD import client as _xrdClient
+except ImportError:
+    _xrdClient = None
+
 ## Set up message logging
 import logging
 log = logging.getLogger("gplLong")
 
 
+## Each exists/getSize costs a forked client plus a network stat
+## round-trip, and callers commonly ask both questions about the same
+## file back to back.  Remember answers briefly; anything that writes
+## or removes a file drops its entries.
+statCacheTTL = 60
+statCacheMax = 4096
+_statCache = {}
+
+
+def _cacheGet(op, fileName):
+    """@brief Cached value as a 1-tuple, or None on miss/expiry."""
+    entry = _statCache.get((op, fileName))
+    if entry is None: return None
+    expires, value = entry
+    if _timer() > expires:
+        # pop, not del: stage copies run on a thread pool and two
+        # threads can race to evict the same expired key
+        _statCache.pop((op, fileName), None)
+        return None
+    return (value,)
+
+
+def _cachePut(op, fileName, value):
+    if len(_statCache) >= statCacheMax: _statCache.clear()
+    _statCache[(op, fileName)] = (_timer() + statCacheTTL, value)
+    return value
+
+
+def _cacheDrop(fileName):
+    _statCache.pop(('exists', fileName), None)
+    _statCache.pop(('getSize', fileName), None)
+    return
+
+
 def copy(fromFile, toFile):
     """
     @brief copy a staged file to final xrootd repository.
@@ -25,32 +74,142 @@ def copy(fromFile, toFile):
 
     This just copies the file.
     """
+    _cacheDrop(toFile)
+    if _xrdClient is not None:
+        return _bindingsCopy([(fromFile, toFile)])
 
-    xrdcmd=xrdcp+" -np -f "+fromFile+" "+toFile   #first time try standard copy
-    log.info("Executing...\n"+xrdcmd)
-    rc = runner.run(xrdcmd)
-    log.debug("xrdcp return code = "+str(rc))
-    
+    xrdcmd = [xrdcp, "-np", "-f", fromFile, toFile]   #first time try standard copy
+    log.info("Executing...\n%s", xrdcmd)
+    rc = runner.run(xrdcmd, timeout=copyTimeout)
+    log.debug("xrdcp return code = %s", rc)
+
+    return rc
+
+
+def copyMany(pairs):
+    """
+    @brief copy several files, reusing one xrootd session when possible.
+    @param pairs = sequence of (fromFile, toFile) tuples
+    @return success code (nonzero if any copy failed)
+    """
+    if _xrdClient is not None:
+        return _bindingsCopy(pairs)
+    rc = 0
+    for fromFile, toFile in pairs:
+        rc |= copy(fromFile, toFile)
+        continue
+    return rc
+
+
+def _bindingsCopy(pairs):
+    """@brief Run a batch of copies through one CopyProcess."""
+    cp = _xrdClient.CopyProcess()
+    for fromFile, toFile in pairs:
+        log.info("xrootd copy job %s -> %s", fromFile, toFile)
+        cp.add_job(fromFile, toFile, force=True)
+        continue
+    cp.prepare()
+    status, results = cp.run()
+    rc = 0
+    for result in results or []:
+        jobStatus = result.get('status')
+        if jobStatus is not None and not jobStatus.ok:
+            log.error("xrootd copy failed: %s", jobStatus.message)
+            rc = 1
+            pass
+        continue
+    if status is not None and not status.ok:
+        log.error("xrootd copy batch failed: %s", status.message)
+        rc = 1
+        pass
     return rc
 
 
 def exists(fileName):
-    xrdcmd = xrdstat + fileName
+    hit = _cacheGet('exists', fileName)
+    if hit is not None: return hit[0]
+    xrdcmd = [xrd, "-w", "stat", fileName]
     xrdrc = runner.run(xrdcmd)
-    log.debug("xrdstat return code = " + str(xrdrc))
+    log.debug("xrdstat return code = %s", xrdrc)
     rc = not xrdrc
+    return _cachePut('exists', fileName, rc)
+
+
+class XrdSession(object):
+    """@brief One long-lived xrd client fed a batch of commands.
+
+    Each runner.run([xrd, ...]) pays a fork plus a TCP connect and
+    authentication round with the redirector.  For a batch of N
+    commands this streams them down one client's stdin instead, so the
+    whole batch costs a single session.  Use submit() per command,
+    then drain() once; the session cannot be reused after drain().
+    """
+
+    def __init__(self):
+        self._proc = subprocess.Popen([xrd], stdin=subprocess.PIPE,
+                                      stdout=subprocess.PIPE,
+                                      stderr=subprocess.STDOUT,
+                                      universal_newlines=True)
+        self.pending = 0
+
+    def submit(self, command):
+        """@brief Queue one xrd command (a single line)."""
+        self._proc.stdin.write(command + '\n')
+        self.pending += 1
+
+    def drain(self):
+        """@brief Run the queued commands; return (status, output)."""
+        out = self._proc.communicate()[0]
+        self.pending = 0
+        return self._proc.returncode, out
+
+
+def removeMany(fileNames):
+    """
+    @brief remove several xrootd files through one client session.
+    @param fileNames = sequence of file names
+    @return success code
+
+    Falls back to one xrd invocation per file if the session can't be
+    started.  As with remove(), failures are tolerable - they normally
+    mean the file didn't exist.
+    """
+    fileNames = list(fileNames)
+    if not fileNames: return 0
+    for fileName in fileNames:
+        _cacheDrop(fileName)
+        continue
+    try:
+        session = XrdSession()
+        for fileName in fileNames:
+            session.submit('rm %s' % fileName)
+            continue
+        rc, out = session.drain()
+        log.debug("xrd batch rm status = %s\n%s", rc, out)
+    except (OSError, ValueError):
+        rc = 0
+        for fileName in fileNames:
+            rc |= remove(fileName)
+            continue
     return rc
 
 
+def getSum(fileName):
+    # No cheap way to checksum a remote file without pulling it over.
+    return None
+
+
 def getSize(fileName):
-    xrdcmd = xrdstat + fileName
-    pipe = os.popen(xrdcmd)
-    lines = pipe.read()
-    rc = pipe.close()
-    if rc: return None
+    hit = _cacheGet('getSize', fileName)
+    if hit is not None: return hit[0]
+    proc = subprocess.Popen([xrd, "-w", "stat", fileName],
+                            stdout=subprocess.PIPE,
+                            universal_newlines=True)
+    lines = proc.communicate()[0]
+    if proc.returncode: return None
     log.debug(lines)
     size = int(lines.split()[1])
-    return size
+    return _cachePut('getSize', fileName, size)
 
 
 def makedirs(name, mode):
@@ -62,7 +221,8 @@ def mkdirFor(fileName, mode):
 
 
 def remove(fileName):
-    xrdcmd = '%s rm %s' % (xrd, fileName)
+    _cacheDrop(fileName)
+    xrdcmd = [xrd, 'rm', fileName]
     rc = runner.run(xrdcmd)  ## failure is Okay => file does not already exist
     return rc
 
@@ -72,7 +232,7 @@ def rmdir(name):
 
 
 def rmtree(name):
-    xrdcmd = '%s rmtree %s' % (xrd, name)
+    xrdcmd = [xrd, 'rmtree', name]
     rc = runner.run(xrdcmd)
     return rc
 